@@ -1,71 +1,188 @@
 import pygame
 import time
-from copy import deepcopy
-from environment import Board 
+from environment import Board, MOVE_WALL, WIN_SCORE, ZSIDE, encode_pawn, encode_wall
+
+try:  # The compiled search is optional; fall back to the Python minimax without Numba
+    import engine_nb
+except ImportError:
+    engine_nb = None
 
 # Constants
 CELL_SIZE = 60
 WINDOW_WIDTH = CELL_SIZE * 9 + 200
 WINDOW_HEIGHT = CELL_SIZE * 9
 UI_COLOR = (240, 240, 240)
-PLAYER_COLORS = {1: (255, 0, 0), 2: (0, 0, 255)}
+PLAYER_COLORS = [None, (255, 0, 0), (0, 0, 255)]  # Indexed by player number
 WALL_COLOR = (100, 100, 100)
 
-def minimax_decision(board, depth, player):
-    """Wrapper function to initiate minimax and return the best move."""
+# Iterative deepening: search depth 1, 2, ... until the time budget runs out
+AI_TIME_BUDGET = 1.0  # Seconds per AI move
+AI_MAX_DEPTH = 5
+
+# Transposition table: search key -> (depth, value, flag, best_move)
+TRANSPOSITION_TABLE = {}
+TT_MAX_ENTRIES = 2_000_000
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+def store_transposition(key, depth, value, alpha, beta, best_move):
+    """Record a search result, keeping the deeper entry when the key already exists."""
+    entry = TRANSPOSITION_TABLE.get(key)
+    if entry is not None and entry[0] > depth:
+        return
+    if entry is None and len(TRANSPOSITION_TABLE) >= TT_MAX_ENTRIES:
+        TRANSPOSITION_TABLE.clear()
+    if value <= alpha:
+        flag = TT_UPPER  # Failed low: value is an upper bound
+    elif value >= beta:
+        flag = TT_LOWER  # Failed high: value is a lower bound
+    else:
+        flag = TT_EXACT
+    TRANSPOSITION_TABLE[key] = (depth, value, flag, best_move)
+
+class SearchTimeout(Exception):
+    """Raised when minimax runs past its deadline."""
+
+def minimax_decision(board, depth, player, prev_best=None, deadline=None):
+    """
+    Wrapper function to initiate minimax and return the best move.
+
+    prev_best, typically the best move of a shallower search, is tried first at
+    the root. If deadline (a time.time() value) passes, SearchTimeout is raised
+    and the board is left unchanged.
+    """
     def get_all_moves(board, player):
-        """Get all possible moves (pawn and walls) for the player."""
-        moves = []
-        # Pawn moves
-        for move in board.get_all_valid_moves(player):
-            moves.append(("move", move))
-        # Wall placements
-        for wall in board.get_all_valid_wall_placements(player):
-            moves.append(("wall", wall))
-        return moves
-
-    def minimax(board, depth, player, alpha=float("-inf"), beta=float("inf")):
+        """Get all possible encoded moves (pawn and walls) for the player."""
+        # Pawn moves, then wall placements
+        return (board.get_all_valid_moves(player)
+                + board.get_all_valid_wall_placements(player, relevant_only=True))
+
+    def ordered_moves(board, player, tt_move):
+        """
+        Yield moves best-first to maximize alpha-beta cutoffs.
+
+        The transposition table move is tried before the full move list is
+        generated, so a cutoff on it skips move generation entirely. Pawn moves
+        are then ordered by progress toward the player's goal row.
+        """
+        if tt_move is not None:
+            yield tt_move
+        row = board.get_position(player)[0]
+        moves = get_all_moves(board, player)
+        # Player 1 heads for row 8 and player 2 for row 0; walls score 0
+        moves.sort(key=lambda m: 0 if m & MOVE_WALL else m // board.size - row,
+                   reverse=(player == 1))
+        for move in moves:
+            if move != tt_move:
+                yield move
+
+    def minimax(board, depth, player, alpha=-WIN_SCORE - 1, beta=WIN_SCORE + 1, first_move=None):
         """Minimax algorithm with alpha-beta pruning."""
         if depth == 0 or board.is_game_over():
             return board.evaluate(), None
+        if deadline is not None and time.time() > deadline:
+            raise SearchTimeout()
+
+        # Probe the transposition table for this position and side to move
+        key = board.zkey ^ ZSIDE if player == 2 else board.zkey
+        entry = TRANSPOSITION_TABLE.get(key)
+        tt_move = entry[3] if entry is not None else None
+        if first_move is not None:
+            tt_move = first_move
+        if entry is not None and entry[0] >= depth:
+            _, value, flag, move = entry
+            if flag == TT_EXACT:
+                return value, move
+            if flag == TT_LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                return value, move
+        alpha_orig, beta_orig = alpha, beta
 
         best_move = None
-        valid_moves = get_all_moves(board, player)
+        valid_moves = ordered_moves(board, player, tt_move)
 
         if player == 1:  # Maximizing player (AI)
-            max_eval = float("-inf")
-            for move_type, move in valid_moves:
-                temp_board = deepcopy(board)
-                if move_type == "move":
-                    temp_board.move_player(player, move)
-                elif move_type == "wall":
-                    temp_board.add_wall(move, player)
-                eval, _ = minimax(temp_board, depth - 1, 2, alpha, beta)
+            max_eval = -WIN_SCORE - 1
+            for move in valid_moves:
+                token = board.do(move, player)
+                try:
+                    eval, _ = minimax(board, depth - 1, 2, alpha, beta)
+                finally:
+                    board.undo(token)  # Also on SearchTimeout
                 if eval > max_eval:
                     max_eval = eval
-                    best_move = (move_type, move)
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
                     break
+            store_transposition(key, depth, max_eval, alpha_orig, beta_orig, best_move)
             return max_eval, best_move
         else:  # Minimizing player (human, but not used here)
-            min_eval = float("inf")
-            for move_type, move in valid_moves:
-                temp_board = deepcopy(board)
-                if move_type == "move":
-                    temp_board.move_player(player, move)
-                elif move_type == "wall":
-                    temp_board.add_wall(move, player)
-                eval, _ = minimax(temp_board, depth - 1, 1, alpha, beta)
+            min_eval = WIN_SCORE + 1
+            for move in valid_moves:
+                token = board.do(move, player)
+                try:
+                    eval, _ = minimax(board, depth - 1, 1, alpha, beta)
+                finally:
+                    board.undo(token)  # Also on SearchTimeout
                 if eval < min_eval:
                     min_eval = eval
-                    best_move = (move_type, move)
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break
+            store_transposition(key, depth, min_eval, alpha_orig, beta_orig, best_move)
             return min_eval, best_move
 
-    return minimax(deepcopy(board), depth, player)
+    return minimax(board, depth, player, first_move=prev_best)
+
+def numba_decision(board, depth, player, prev_best=None):
+    """Run the Numba-compiled search, returning (score, encoded move or None) like minimax_decision."""
+    score, move = engine_nb.search(
+        board.pawn[1].bit_length() - 1, board.pawn[2].bit_length() - 1,
+        engine_nb.bitboard_to_array(board.h_edges), engine_nb.bitboard_to_array(board.v_edges),
+        board.walls_left[1], board.walls_left[2],
+        depth, player, -WIN_SCORE - 1, WIN_SCORE + 1,
+        engine_nb.NO_MOVE if prev_best is None else prev_best)
+    return score, (None if move == engine_nb.NO_MOVE else int(move))
+
+def ai_decision(board, player):
+    """
+    Pick a move by iterative deepening within AI_TIME_BUDGET seconds.
+
+    Each depth is seeded with the previous depth's best move. The Python search
+    is abandoned when the deadline passes; the compiled search cannot be
+    interrupted, so a depth is only started if its estimated cost (the last
+    depth's time times the growth from the depth before) fits in the time left.
+
+    Returns:
+        tuple: (encoded best move or None, deepest completed depth).
+    """
+    deadline = time.time() + AI_TIME_BUDGET
+    best_move, completed = None, 0
+    last_elapsed = prev_elapsed = 0.0  # Time taken by the last two depths
+    for depth in range(1, AI_MAX_DEPTH + 1):
+        start = time.time()
+        if start > deadline:
+            break
+        if (engine_nb is not None and prev_elapsed > 0
+                and last_elapsed * last_elapsed / prev_elapsed > deadline - start):
+            break  # The next compiled depth would most likely overrun the budget
+        try:
+            if engine_nb is not None:
+                _, move = numba_decision(board, depth, player, prev_best=best_move)
+            else:
+                # Depth 1 always completes so there is a move to play
+                _, move = minimax_decision(board, depth, player, prev_best=best_move,
+                                           deadline=deadline if depth > 1 else None)
+        except SearchTimeout:
+            break
+        prev_elapsed, last_elapsed = last_elapsed, time.time() - start
+        if move is not None:
+            best_move, completed = move, depth
+    return best_move, completed
 
 def main():
     pygame.init()
@@ -77,6 +194,18 @@ def main():
     board = Board()
     current_player = 1  # AI starts first
     game_over = False
+    text_cache = {}  # (text, color) -> rendered Surface
+    # Legal human moves, computed once at the start of each human turn
+    human_moves = set()
+    human_walls = set()
+
+    def render_text(text, color):
+        """Render sidebar text, reusing the Surface while the string is unchanged."""
+        surface = text_cache.get((text, color))
+        if surface is None:
+            surface = font.render(text, True, color)
+            text_cache[(text, color)] = surface
+        return surface
 
     def draw_board():
         """Render the board, players, walls, and UI elements."""
@@ -86,32 +215,33 @@ def main():
             pygame.draw.line(screen, (0, 0, 0), (i*CELL_SIZE, 0), (i*CELL_SIZE, WINDOW_HEIGHT))
             pygame.draw.line(screen, (0, 0, 0), (0, i*CELL_SIZE), (WINDOW_WIDTH - 200, i*CELL_SIZE))
         # Draw players
-        for p, (row, col) in board.players.items():
+        for p in (1, 2):
+            row, col = board.get_position(p)
             pygame.draw.circle(screen, PLAYER_COLORS[p], 
                              (col*CELL_SIZE + CELL_SIZE//2, row*CELL_SIZE + CELL_SIZE//2), 
                              CELL_SIZE//3)
         # Draw walls
-        for wall in board.walls['horizontal']:
+        for wall in board.get_wall_cells('horizontal'):
             row, col = wall
             pygame.draw.line(screen, WALL_COLOR, 
                             (col*CELL_SIZE, (row + 1)*CELL_SIZE), 
                             ((col + 1)*CELL_SIZE, (row + 1)*CELL_SIZE), 5)
-        for wall in board.walls['vertical']:
+        for wall in board.get_wall_cells('vertical'):
             row, col = wall
             pygame.draw.line(screen, WALL_COLOR, 
                             ((col + 1)*CELL_SIZE, row*CELL_SIZE), 
                             ((col + 1)*CELL_SIZE, (row + 1)*CELL_SIZE), 5)
         # Sidebar UI
         pygame.draw.rect(screen, UI_COLOR, (CELL_SIZE*9, 0, 200, WINDOW_HEIGHT))
-        text = font.render(f'AI Walls: {board.walls_left[1]}', True, PLAYER_COLORS[1])
+        text = render_text(f'AI Walls: {board.walls_left[1]}', PLAYER_COLORS[1])
         screen.blit(text, (CELL_SIZE*9 + 10, 50))
-        text = font.render(f'Your Walls: {board.walls_left[2]}', True, PLAYER_COLORS[2])
+        text = render_text(f'Your Walls: {board.walls_left[2]}', PLAYER_COLORS[2])
         screen.blit(text, (CELL_SIZE*9 + 10, 100))
-        text = font.render(f'Turn: {"AI" if current_player == 1 else "You"}', True, (0, 0, 0))
+        text = render_text(f'Turn: {"AI" if current_player == 1 else "You"}', (0, 0, 0))
         screen.blit(text, (CELL_SIZE*9 + 10, 150))
         if game_over:
-            winner = 1 if board.players[1][0] == 8 else 2
-            text = font.render(f'{"AI" if winner ==1 else "You"} Won!', True, (0, 200, 0))
+            winner = 1 if board.get_position(1)[0] == 8 else 2
+            text = render_text(f'{"AI" if winner ==1 else "You"} Won!', (0, 200, 0))
             screen.blit(text, (CELL_SIZE*9 + 10, 200))
 
     running = True
@@ -119,19 +249,18 @@ def main():
         # AI's turn (Player 1)
         if not game_over and current_player == 1:
             start_time = time.time()
-            _, best_move = minimax_decision(board, depth=2, player=1)
-            print(f"AI Move Time: {time.time() - start_time:.2f}s")
-            if best_move:
-                move_type, move = best_move
-                if move_type == "move":
-                    board.move_player(1, move)
-                elif move_type == "wall" and board.walls_left[1] > 0:
-                    board.add_wall(move, 1)
+            best_move, depth = ai_decision(board, player=1)
+            print(f"AI Move Time: {time.time() - start_time:.2f}s (depth {depth})")
+            if best_move is not None:
+                board.do(best_move, 1)
                 # Check game over
                 if board.is_game_over():
                     game_over = True
+                    text_cache.clear()
                 else:
                     current_player = 2  # Switch to human
+                    human_moves = set(board.get_all_valid_moves(2))
+                    human_walls = set(board.get_all_valid_wall_placements(2))
 
         # Event handling for human (Player 2)
         for event in pygame.event.get():
@@ -144,10 +273,13 @@ def main():
                     col = x // CELL_SIZE
                     row = y // CELL_SIZE
                     # Check if it's a valid pawn move
-                    if (row, col) in board.get_all_valid_moves(2):
-                        board.move_player(2, (row, col))
+                    if encode_pawn(row, col) in human_moves:
+                        board.do(encode_pawn(row, col), 2)
+                        human_moves.clear()
+                        human_walls.clear()
                         if board.is_game_over():
                             game_over = True
+                            text_cache.clear()
                         else:
                             current_player = 1
                     # Check for wall placement (horizontal/vertical)
@@ -156,17 +288,21 @@ def main():
                         if y % CELL_SIZE > CELL_SIZE - 10:
                             wall_row = row
                             wall_col = col
-                            wall_move = (wall_row, wall_col, 'horizontal')
-                            if wall_move in board.get_all_valid_wall_placements(2):
-                                board.add_wall(wall_move, 2)
+                            wall_move = encode_wall(wall_row, wall_col, 'horizontal')
+                            if wall_move in human_walls:
+                                board.do(wall_move, 2)
+                                human_moves.clear()
+                                human_walls.clear()
                                 current_player = 1
                         # Vertical wall (click near right of a cell)
                         elif x % CELL_SIZE > CELL_SIZE - 10:
                             wall_row = row
                             wall_col = col
-                            wall_move = (wall_row, wall_col, 'vertical')
-                            if wall_move in board.get_all_valid_wall_placements(2):
-                                board.add_wall(wall_move, 2)
+                            wall_move = encode_wall(wall_row, wall_col, 'vertical')
+                            if wall_move in human_walls:
+                                board.do(wall_move, 2)
+                                human_moves.clear()
+                                human_walls.clear()
                                 current_player = 1
 
         draw_board()
@@ -0,0 +1,263 @@
+"""
+Numba-compiled minimax search over an array form of the board.
+
+The board is passed in as plain integers and arrays so the whole search runs
+in nopython mode: pawns are square indices, walls are a (2, 81) uint8 array of
+blocked edges (row 0 = horizontal, row 1 = vertical, same layout as the Board
+bitboards). Moves use the same int encoding as environment.encode_pawn() and
+environment.encode_wall().
+"""
+import numpy as np
+from numba import njit
+
+from environment import MOVE_WALL, NEIGHBORS, NO_PATH, SIZE, SQUARE_MASK, WALL_VERTICAL, WIN_SCORE
+
+NUM_SQUARES = SIZE * SIZE
+NO_MOVE = -1
+MAX_MOVES = 4 + 2 * (SIZE - 1) * (SIZE - 1)
+
+# NEIGHBORS_FLAT[sq, i] = (neighbor_sq, wall_kind, wall_square), padded with -1
+NEIGHBORS_FLAT = np.full((NUM_SQUARES, 4, 3), -1, dtype=np.int8)
+for _sq, _edges in enumerate(NEIGHBORS):
+    for _i, (_nsq, _kind, _wall_bit) in enumerate(_edges):
+        NEIGHBORS_FLAT[_sq, _i] = (_nsq, _kind, _wall_bit.bit_length() - 1)
+del _sq, _edges, _i, _nsq, _kind, _wall_bit
+
+
+@njit(cache=True)
+def _shortest_path(walls, start, goal_row, queue):
+    """BFS distance from start to goal_row, or NO_PATH if it is unreachable."""
+    # Visited squares as two 63-bit words so no set is needed
+    visited_lo = np.int64(0)
+    visited_hi = np.int64(0)
+    if start < 63:
+        visited_lo |= np.int64(1) << start
+    else:
+        visited_hi |= np.int64(1) << (start - 63)
+    queue[0] = start
+    head = 0
+    tail = 1
+    dist = 0
+    level_end = 1
+    while head < tail:
+        if head == level_end:
+            dist += 1
+            level_end = tail
+        sq = queue[head]
+        head += 1
+        if sq // SIZE == goal_row:
+            return dist
+        for i in range(4):
+            nsq = NEIGHBORS_FLAT[sq, i, 0]
+            if nsq < 0:
+                break
+            if walls[NEIGHBORS_FLAT[sq, i, 1], NEIGHBORS_FLAT[sq, i, 2]]:
+                continue
+            if nsq < 63:
+                bit = np.int64(1) << nsq
+                if visited_lo & bit:
+                    continue
+                visited_lo |= bit
+            else:
+                bit = np.int64(1) << (nsq - 63)
+                if visited_hi & bit:
+                    continue
+                visited_hi |= bit
+            queue[tail] = nsq
+            tail += 1
+    return NO_PATH
+
+
+@njit(cache=True)
+def _evaluate(walls, pawns, walls_left, queue):
+    """Board.evaluate() with integer scores (+/-WIN_SCORE when a player is cut off)."""
+    p1_distance = _shortest_path(walls, pawns[1], SIZE - 1, queue)
+    if p1_distance == NO_PATH:
+        return -WIN_SCORE
+    p2_distance = _shortest_path(walls, pawns[2], 0, queue)
+    if p2_distance == NO_PATH:
+        return WIN_SCORE
+    score = p2_distance - p1_distance + (walls_left[1] - walls_left[2]) * 2
+    if p2_distance <= 3:
+        score -= 15 * (4 - p2_distance)
+    return score
+
+
+@njit(cache=True)
+def _paths_exist(walls, pawns, queue):
+    """True if both players can still reach their goal rows."""
+    return (_shortest_path(walls, pawns[1], SIZE - 1, queue) != NO_PATH
+            and _shortest_path(walls, pawns[2], 0, queue) != NO_PATH)
+
+
+@njit(cache=True)
+def _relevant_anchors(walls, pawns):
+    """Mark squares near either pawn (distance <= 2) or a wall segment (distance <= 1)."""
+    relevant = np.zeros(NUM_SQUARES, dtype=np.uint8)
+    for sq in range(NUM_SQUARES):
+        row = sq // SIZE
+        col = sq % SIZE
+        radius = -1
+        if walls[0, sq] or walls[1, sq]:
+            radius = 1
+        if sq == pawns[1] or sq == pawns[2]:
+            radius = 2
+        if radius < 0:
+            continue
+        for r in range(max(0, row - radius), min(SIZE, row + radius + 1)):
+            for c in range(max(0, col - radius), min(SIZE, col + radius + 1)):
+                relevant[r * SIZE + c] = 1
+    return relevant
+
+
+@njit(cache=True)
+def _scan_walls(walls, pawns, relevant, moves, count, queue):
+    """Append legal walls anchored on relevant squares to moves, returning the new count."""
+    for kind in range(2):
+        for row in range(SIZE - 1):
+            for col in range(SIZE - 1):
+                sq = row * SIZE + col
+                if not relevant[sq]:
+                    continue
+                second = sq + 1 if kind == 0 else sq + SIZE
+                # Walls may not overlap any wall segment of either orientation
+                if walls[0, sq] or walls[1, sq] or walls[0, second] or walls[1, second]:
+                    continue
+                walls[kind, sq] = 1
+                walls[kind, second] = 1
+                if _paths_exist(walls, pawns, queue):
+                    moves[count] = MOVE_WALL | (WALL_VERTICAL if kind == 1 else 0) | sq
+                    count += 1
+                walls[kind, sq] = 0
+                walls[kind, second] = 0
+    return count
+
+
+@njit(cache=True)
+def _generate_moves(walls, pawns, walls_left, player, moves, queue):
+    """
+    Fill moves in search order and return how many were written.
+
+    Matches the Python search order: pawn moves toward the goal, sideways pawn
+    moves, walls, then pawn moves away from the goal.
+    """
+    sq = pawns[player]
+    forward = SIZE if player == 1 else -SIZE
+    pawn_moves = np.empty(4, dtype=np.int64)
+    n_pawn = 0
+    for i in range(4):
+        nsq = NEIGHBORS_FLAT[sq, i, 0]
+        if nsq < 0:
+            break
+        if not walls[NEIGHBORS_FLAT[sq, i, 1], NEIGHBORS_FLAT[sq, i, 2]]:
+            pawn_moves[n_pawn] = nsq
+            n_pawn += 1
+
+    count = 0
+    for i in range(n_pawn):
+        if pawn_moves[i] - sq == forward:
+            moves[count] = pawn_moves[i]
+            count += 1
+    for i in range(n_pawn):
+        if pawn_moves[i] - sq != forward and pawn_moves[i] - sq != -forward:
+            moves[count] = pawn_moves[i]
+            count += 1
+    if walls_left[player] > 0:
+        start = count
+        count = _scan_walls(walls, pawns, _relevant_anchors(walls, pawns), moves, count, queue)
+        if count == start:
+            count = _scan_walls(walls, pawns, np.ones(NUM_SQUARES, dtype=np.uint8),
+                                moves, count, queue)
+    for i in range(n_pawn):
+        if pawn_moves[i] - sq == -forward:
+            moves[count] = pawn_moves[i]
+            count += 1
+    return count
+
+
+# Recursive functions need an explicit signature to be reloaded safely from the cache
+@njit("UniTuple(int64, 2)(uint8[:, ::1], int64[::1], int64[::1], int64, int64, int64, int64, "
+      "int64[::1], int64)", cache=True)
+def _minimax(walls, pawns, walls_left, depth, player, alpha, beta, queue, first_move):
+    """Alpha-beta minimax returning (score, encoded best move); first_move is searched first."""
+    if depth == 0 or pawns[1] // SIZE == SIZE - 1 or pawns[2] // SIZE == 0:
+        return _evaluate(walls, pawns, walls_left, queue), NO_MOVE
+
+    moves = np.empty(MAX_MOVES, dtype=np.int64)
+    count = _generate_moves(walls, pawns, walls_left, player, moves, queue)
+    if first_move != NO_MOVE:
+        # Shift first_move to the front, keeping the order of the rest
+        for i in range(count):
+            if moves[i] == first_move:
+                for j in range(i, 0, -1):
+                    moves[j] = moves[j - 1]
+                moves[0] = first_move
+                break
+    best_move = NO_MOVE
+    best = -WIN_SCORE - 1 if player == 1 else WIN_SCORE + 1
+    for i in range(count):
+        move = moves[i]
+        if move & MOVE_WALL:
+            sq = move & SQUARE_MASK
+            kind = 1 if move & WALL_VERTICAL else 0
+            second = sq + 1 if kind == 0 else sq + SIZE
+            walls[kind, sq] = 1
+            walls[kind, second] = 1
+            walls_left[player] -= 1
+            score, _ = _minimax(walls, pawns, walls_left, depth - 1, 3 - player, alpha, beta, queue,
+                                np.int64(NO_MOVE))
+            walls_left[player] += 1
+            walls[kind, sq] = 0
+            walls[kind, second] = 0
+        else:
+            previous = pawns[player]
+            pawns[player] = move
+            score, _ = _minimax(walls, pawns, walls_left, depth - 1, 3 - player, alpha, beta, queue,
+                                np.int64(NO_MOVE))
+            pawns[player] = previous
+
+        if player == 1:
+            if score > best:
+                best = score
+                best_move = move
+            alpha = max(alpha, score)
+        else:
+            if score < best:
+                best = score
+                best_move = move
+            beta = min(beta, score)
+        if beta <= alpha:
+            break
+    return best, best_move
+
+
+@njit(cache=True)
+def search(pawn1, pawn2, h, v, wl1, wl2, depth, player, alpha, beta, first_move=NO_MOVE):
+    """
+    Run minimax from the given position.
+
+    Args:
+        pawn1, pawn2 (int): Square index of each player's pawn.
+        h, v (np.ndarray): uint8 arrays of length 81 marking blocked edges.
+        wl1, wl2 (int): Walls left for each player.
+        depth (int): Search depth in plies.
+        player (int): Player to move (1 maximizes, 2 minimizes).
+        alpha, beta (int): Initial search window.
+        first_move (int): Encoded root move to search first, e.g. the best move
+            of a shallower search, or NO_MOVE.
+
+    Returns:
+        tuple: (score, encoded best move or NO_MOVE).
+    """
+    walls = np.empty((2, NUM_SQUARES), dtype=np.uint8)
+    walls[0] = h
+    walls[1] = v
+    pawns = np.array([0, pawn1, pawn2], dtype=np.int64)
+    walls_left = np.array([0, wl1, wl2], dtype=np.int64)
+    queue = np.empty(NUM_SQUARES, dtype=np.int64)
+    return _minimax(walls, pawns, walls_left, depth, player, alpha, beta, queue, first_move)
+
+
+def bitboard_to_array(bitboard):
+    """Convert an 81-bit wall bitboard into the uint8 edge array used by search()."""
+    return np.array([(bitboard >> sq) & 1 for sq in range(NUM_SQUARES)], dtype=np.uint8)
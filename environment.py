@@ -1,73 +1,219 @@
+import heapq
+import random
+
+try:  # NumPy is optional; wall legality falls back to one path search per wall
+    import numpy as np
+except ImportError:
+    np = None
+
+SIZE = 9  # Quoridor board is a 9x9 grid
+NO_PATH = 10_000  # Distance when a player cannot reach their goal
+WIN_SCORE = 10 ** 9  # Score when a player has no path; stays an int like every other score
+WALLS_PER_PLAYER = 10
+
+# Squares are numbered sq = row * 9 + col and a position is the bit 1 << sq.
+# Walls are kept as anchor bitboards over the same 81 squares, one bit per wall
+# at its (row, col), plus the blocked edges they expand to:
+#   h_edges bit sq set -> the edge below square sq is blocked
+#   v_edges bit sq set -> the edge right of square sq is blocked
+H_WALL_MASK = 0b11  # Horizontal wall covers (row, col) and (row, col + 1)
+V_WALL_MASK = (1 << SIZE) | 1  # Vertical wall covers (row, col) and (row + 1, col)
+
+# Per-square adjacency: NEIGHBORS[sq] lists (neighbor_sq, wall_kind, wall_bit)
+# for every on-board step, where wall_kind selects the bitboard (0 = h, 1 = v)
+# and wall_bit is the bit in it that blocks the step.
+NEIGHBORS = [[] for _ in range(SIZE * SIZE)]
+for _sq in range(SIZE * SIZE):
+    _row, _col = divmod(_sq, SIZE)
+    if _row > 0:  # Up
+        NEIGHBORS[_sq].append((_sq - SIZE, 0, 1 << (_sq - SIZE)))
+    if _row < SIZE - 1:  # Down
+        NEIGHBORS[_sq].append((_sq + SIZE, 0, 1 << _sq))
+    if _col > 0:  # Left
+        NEIGHBORS[_sq].append((_sq - 1, 1, 1 << (_sq - 1)))
+    if _col < SIZE - 1:  # Right
+        NEIGHBORS[_sq].append((_sq + 1, 1, 1 << _sq))
+del _sq, _row, _col
+
+# Overlap masks by anchor square: a wall may not share a segment with any wall
+# of either orientation. H_CONFLICTS[sq] / V_CONFLICTS[sq] hold the
+# (h anchors, v anchors) that overlap a horizontal / vertical wall at sq.
+_H_ANCHORS = [sq for sq in range(SIZE * SIZE) if sq % SIZE < SIZE - 1]
+_V_ANCHORS = [sq for sq in range(SIZE * SIZE) if sq // SIZE < SIZE - 1]
+H_CONFLICTS, V_CONFLICTS = [(0, 0)] * (SIZE * SIZE), [(0, 0)] * (SIZE * SIZE)
+for _table, _anchors, _mask in ((H_CONFLICTS, _H_ANCHORS, H_WALL_MASK),
+                                (V_CONFLICTS, _V_ANCHORS, V_WALL_MASK)):
+    for _sq in _anchors:
+        _cells = _mask << _sq
+        _table[_sq] = (
+            sum(1 << _a for _a in _H_ANCHORS if (H_WALL_MASK << _a) & _cells),
+            sum(1 << _a for _a in _V_ANCHORS if (V_WALL_MASK << _a) & _cells),
+        )
+del _table, _anchors, _mask, _sq, _cells
+
+# NEAR1[sq] / NEAR2[sq]: squares within Chebyshev distance 1 / 2 of sq
+ALL_SQUARES = (1 << (SIZE * SIZE)) - 1
+NEAR1, NEAR2 = [], []
+for _sq in range(SIZE * SIZE):
+    _row, _col = divmod(_sq, SIZE)
+    for _table, _radius in ((NEAR1, 1), (NEAR2, 2)):
+        _table.append(sum(1 << (_r * SIZE + _c)
+                          for _r in range(max(0, _row - _radius), min(SIZE, _row + _radius + 1))
+                          for _c in range(max(0, _col - _radius), min(SIZE, _col + _radius + 1))))
+del _sq, _row, _col, _table, _radius
+
+CACHE_MAX_ENTRIES = 100_000
+
+# Scratch buffers shared by every shortest_path call; the search is single
+# threaded, so these would need to move into a threading.local otherwise.
+_SCRATCH_HEAP = []
+_UNREACHED_G_SCORES = bytes([0xFF]) * (SIZE * SIZE)
+_SCRATCH_G_SCORE = bytearray(_UNREACHED_G_SCORES)
+
+# Zobrist keys: a position hashes to the XOR of the keys of its features, so
+# Board.zkey can be updated incrementally as pawns move and walls are placed.
+_zobrist_rng = random.Random(0xC0FFEE)
+ZPAWN = [None] + [[_zobrist_rng.getrandbits(64) for _ in range(SIZE * SIZE)] for _ in range(2)]
+ZH = [_zobrist_rng.getrandbits(64) for _ in range(SIZE * SIZE)]  # By wall anchor square
+ZV = [_zobrist_rng.getrandbits(64) for _ in range(SIZE * SIZE)]
+ZWALLS_LEFT = [None] + [[_zobrist_rng.getrandbits(64) for _ in range(WALLS_PER_PLAYER + 1)]
+                        for _ in range(2)]
+ZSIDE = _zobrist_rng.getrandbits(64)  # XORed in when player 2 is to move
+del _zobrist_rng
+
+
+# Moves are encoded as ints: a pawn move is its destination square, a wall is
+# MOVE_WALL | orientation | anchor square.
+MOVE_WALL = 1 << 15  # Set for wall placements
+WALL_VERTICAL = 1 << 7  # Set for vertical walls
+SQUARE_MASK = 0x7F  # Destination or anchor square
+
+
+def to_square(row, col):
+    """Convert a (row, col) position to its square index."""
+    return row * SIZE + col
+
+
+def to_position(bit):
+    """Convert a single-bit square mask back to (row, col)."""
+    return divmod(bit.bit_length() - 1, SIZE)
+
+
+def _bitboard_to_array(bitboard):
+    """Unpack an 81-bit bitboard into a NumPy bool array indexed by square."""
+    packed = np.frombuffer(bitboard.to_bytes((SIZE * SIZE + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder="little")[:SIZE * SIZE].astype(bool)
+
+
+def encode_pawn(row, col):
+    """Encode a pawn move to (row, col)."""
+    return to_square(row, col)
+
+
+def encode_wall(row, col, wall_type):
+    """Encode a "horizontal" or "vertical" wall anchored at (row, col)."""
+    return MOVE_WALL | (WALL_VERTICAL if wall_type == "vertical" else 0) | to_square(row, col)
+
 
 class Board:
     def __init__(self):
         """Initialize the Quoridor board and its attributes."""
-        self.size = 9  # Quoridor board is a 9x9 grid
-        self.board = [["." for _ in range(self.size)] for _ in range(self.size)]  # Initialize empty grid
-        self.walls = {"horizontal": set(), "vertical": set()}  # Store wall positions
-        self.players = {1: (0, 4), 2: (8, 4)}  # Default starting positions for players (row, column)
-        self.walls_left = {1: 10, 2: 10}  # Number of walls left for each player
+        self.size = SIZE
+        # Pawn bitboards indexed by player number (index 0 unused)
+        self.pawn = [None, 1 << to_square(0, 4), 1 << to_square(8, 4)]
+        self.h = 0  # Horizontal wall anchors
+        self.v = 0  # Vertical wall anchors
+        self.h_edges = 0  # Edges blocked by horizontal walls
+        self.v_edges = 0  # Edges blocked by vertical walls
+        self.walls_left = [0, WALLS_PER_PLAYER, WALLS_PER_PLAYER]  # Walls left for each player
+        # Zobrist hash of pawns, walls and walls left (side to move is added by the search)
+        self.zkey = (ZPAWN[1][to_square(0, 4)] ^ ZPAWN[2][to_square(8, 4)]
+                     ^ ZWALLS_LEFT[1][WALLS_PER_PLAYER] ^ ZWALLS_LEFT[2][WALLS_PER_PLAYER])
+        self._wall_cache = {}  # (zkey, walls left, relevant_only) -> wall placements
+        self._path_cache = {}  # zkey -> (p1_distance, p2_distance)
+        # Shortest path lengths for the current position, None once a move invalidates them
+        self._cache_d1 = None
+        self._cache_d2 = None
 
     def is_within_bounds(self, row, col):
         """Check if a position is within the board boundaries."""
         return 0 <= row < self.size and 0 <= col < self.size
-    
+
+    def get_position(self, player):
+        """Return the (row, col) position of a player's pawn."""
+        return to_position(self.pawn[player])
+
+    def get_wall_cells(self, wall_type):
+        """Return the (row, col) cells blocked by walls of the given type."""
+        walls = self.h_edges if wall_type == "horizontal" else self.v_edges
+        cells = []
+        while walls:
+            bit = walls & -walls
+            cells.append(to_position(bit))
+            walls ^= bit
+        return cells
+
+    def shortest_path(self, player, goal_row):
+        """A* search for the shortest path of a player to their goal row."""
+        walls = (self.h_edges, self.v_edges)
+        start = self.pawn[player].bit_length() - 1
+        # Reuse the module-level scratch buffers instead of allocating per call
+        heap = _SCRATCH_HEAP
+        heap.clear()
+        g_score = _SCRATCH_G_SCORE
+        g_score[:] = _UNREACHED_G_SCORES
+        # Rows still to cross is an admissible heuristic with unit step costs
+        heap.append((abs(goal_row - start // SIZE), 0, start))  # (f, g, square)
+        g_score[start] = 0
+        closed = 0  # Bitmask of expanded squares
+
+        while heap:
+            _, dist, sq = heapq.heappop(heap)
+            if (closed >> sq) & 1:
+                continue  # Stale entry, the square was already expanded
+            closed |= 1 << sq
+
+            # Check if goal reached
+            if sq // SIZE == goal_row:
+                return dist
+
+            for nsq, kind, wall_bit in NEIGHBORS[sq]:
+                if walls[kind] & wall_bit or (closed >> nsq) & 1:
+                    continue
+                if dist + 1 < g_score[nsq]:
+                    g_score[nsq] = dist + 1
+                    heapq.heappush(heap, (dist + 1 + abs(goal_row - nsq // SIZE), dist + 1, nsq))
+
+        return NO_PATH
+
+    def distances(self):
+        """
+        Return (p1_distance, p2_distance) for the current position.
+
+        Reuses the distances kept across moves when still valid (a pawn move only
+        invalidates the mover's distance), then the per-position cache, and only
+        searches for the distances that are missing.
+        """
+        p1_distance, p2_distance = self._cache_d1, self._cache_d2
+        if p1_distance is None or p2_distance is None:
+            paths = self._path_cache.get(self.zkey)
+            if paths is not None:
+                p1_distance, p2_distance = paths
+            else:
+                if p1_distance is None:
+                    p1_distance = self.shortest_path(1, 8)  # Player 1's goal: row 8
+                if p2_distance is None:
+                    p2_distance = self.shortest_path(2, 0)  # Player 2's goal: row 0
+                self._cache_paths(self.zkey, (p1_distance, p2_distance))
+            self._cache_d1, self._cache_d2 = p1_distance, p2_distance
+        return p1_distance, p2_distance
+
     def evaluate(self):
         """
         Evaluate the board state from the perspective of Player 1.
         Improved to consider path difference, wall advantage, and opponent proximity.
         """
-        from collections import deque
-
-        def shortest_path(player, goal_row):
-            """BFS to find shortest path for a player to their goal row."""
-            start_row, start_col = self.players[player]
-            visited = set()
-            queue = deque([(start_row, start_col, 0)])  # (row, col, distance)
-            shortest_distance = float("inf")
-
-            while queue:
-                row, col, dist = queue.popleft()  # Use BFS (FIFO)
-
-                if (row, col) in visited:
-                    continue
-                visited.add((row, col))
-
-                # Check if goal reached
-                if row == goal_row:
-                    shortest_distance = dist
-                    break  # BFS guarantees shortest path
-
-                # Get valid moves without modifying the board state
-                valid_moves = []
-                current_pos = (row, col)
-                # Check all possible moves (up, down, left, right)
-                for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    new_row, new_col = row + dr, col + dc
-                    if self.is_within_bounds(new_row, new_col):
-                        # Check for walls blocking the move
-                        if dr == -1:  # Up
-                            if (row - 1, col) not in self.walls["horizontal"]:
-                                valid_moves.append((new_row, new_col))
-                        elif dr == 1:  # Down
-                            if (row, col) not in self.walls["horizontal"]:
-                                valid_moves.append((new_row, new_col))
-                        elif dc == -1:  # Left
-                            if (row, col - 1) not in self.walls["vertical"]:
-                                valid_moves.append((new_row, new_col))
-                        elif dc == 1:  # Right
-                            if (row, col) not in self.walls["vertical"]:
-                                valid_moves.append((new_row, new_col))
-
-                for move in valid_moves:
-                    if move not in visited:
-                        queue.append((move[0], move[1], dist + 1))
-
-            return shortest_distance if shortest_distance != float("inf") else float("inf")
-
-        # Calculate shortest paths
-        p1_distance = shortest_path(1, 8)  # Player 1's goal: row 8
-        p2_distance = shortest_path(2, 0)  # Player 2's goal: row 0
+        p1_distance, p2_distance = self.distances()
 
         # Base score: Favor shorter agent path and longer opponent path
         base_score = p2_distance - p1_distance
@@ -82,10 +228,10 @@ class Board:
             opponent_penalty = -15 * (4 - p2_distance)  # Exponential penalty
 
         # Check for game-ending conditions
-        if p1_distance == float("inf"):
-            return -float("inf")  # Agent has no path (worst case)
-        if p2_distance == float("inf"):
-            return float("inf")  # Opponent has no path (best case)
+        if p1_distance == NO_PATH:
+            return -WIN_SCORE  # Agent has no path (worst case)
+        if p2_distance == NO_PATH:
+            return WIN_SCORE  # Opponent has no path (best case)
 
         # Combine all factors
         total_score = base_score + wall_score + opponent_penalty
@@ -94,40 +240,48 @@ class Board:
     def add_wall(self, move, player):
         """
         Add a wall to the board.
-        
+
         Args:
-            wall_type (str): "horizontal" or "vertical".
-            position (tuple): Starting position of the wall (row, col).
-        
+            move (tuple): (row, col, wall_type) with wall_type "horizontal" or "vertical".
+            player (int): Player number (1 or 2).
+
         Returns:
             bool: True if the wall was added successfully, False otherwise.
         """
-        position = move[:2]
-        wall_type = move[2]
-        if wall_type not in self.walls:
-            return False
-
+        row, col, wall_type = move
         if wall_type == "horizontal":
-            if (self.is_within_bounds(position[0], position[1]) and 
-                self.is_within_bounds(position[0], position[1] + 1)):
-                if (position not in self.walls["horizontal"] and 
-                    (position[0], position[1] + 1) not in self.walls["horizontal"]):
-                    self.walls["horizontal"].add(position)
-                    self.walls["horizontal"].add((position[0], position[1] + 1))
-                    self.walls_left[player] -= 1
+            if self.is_within_bounds(row, col) and self.is_within_bounds(row, col + 1):
+                if not self.h & H_CONFLICTS[to_square(row, col)][0]:
+                    self._place_wall(to_square(row, col), 0, player)
                     return True
         elif wall_type == "vertical":
-            if (self.is_within_bounds(position[0], position[1]) and 
-                self.is_within_bounds(position[0] + 1, position[1])):
-                if (position not in self.walls["vertical"] and 
-                    (position[0] + 1, position[1]) not in self.walls["vertical"]):
-                    self.walls["vertical"].add(position)
-                    self.walls["vertical"].add((position[0] + 1, position[1]))
-                    self.walls_left[player] -= 1
+            if self.is_within_bounds(row, col) and self.is_within_bounds(row + 1, col):
+                if not self.v & V_CONFLICTS[to_square(row, col)][1]:
+                    self._place_wall(to_square(row, col), WALL_VERTICAL, player)
                     return True
 
         return False
 
+    def _place_wall(self, sq, vertical, player):
+        """Place a wall anchored at square sq without legality checks."""
+        if vertical:
+            self.v |= 1 << sq
+            self.v_edges |= V_WALL_MASK << sq
+            self.zkey ^= ZV[sq]
+        else:
+            self.h |= 1 << sq
+            self.h_edges |= H_WALL_MASK << sq
+            self.zkey ^= ZH[sq]
+        self._use_wall(player)
+        # A wall can lengthen either player's path
+        self._cache_d1 = self._cache_d2 = None
+
+    def _use_wall(self, player):
+        """Decrement a player's wall count, keeping the Zobrist key in sync."""
+        walls_left = self.walls_left[player]
+        self.zkey ^= ZWALLS_LEFT[player][walls_left] ^ ZWALLS_LEFT[player][walls_left - 1]
+        self.walls_left[player] = walls_left - 1
+
     def move_player(self, player, new_position):
         """
         Move a player to a new position.
@@ -139,15 +293,49 @@ class Board:
         Returns:
             bool: True if the move was successful, False otherwise.
         """
-        if player not in self.players:
+        if player not in (1, 2):
             return False
 
         if self.is_within_bounds(new_position[0], new_position[1]):
-            self.players[player] = new_position
+            self._move_pawn(player, to_square(*new_position))
             return True
 
         return False
 
+    def _move_pawn(self, player, sq):
+        """Move a player's pawn to square sq without legality checks."""
+        self.zkey ^= ZPAWN[player][self.pawn[player].bit_length() - 1] ^ ZPAWN[player][sq]
+        self.pawn[player] = 1 << sq
+        # Only the mover's distance changes; walls are untouched
+        if player == 1:
+            self._cache_d1 = None
+        else:
+            self._cache_d2 = None
+
+    def do(self, move, player):
+        """
+        Apply an encoded pawn move or wall placement in place.
+
+        Args:
+            move (int): Move encoded by encode_pawn() or encode_wall().
+            player (int): Player number (1 or 2).
+
+        Returns:
+            tuple: Undo token to pass to undo().
+        """
+        token = (player, self.pawn[player], self.h, self.v, self.h_edges, self.v_edges,
+                 self.walls_left[player], self.zkey, self._cache_d1, self._cache_d2)
+        if move & MOVE_WALL:
+            self._place_wall(move & SQUARE_MASK, move & WALL_VERTICAL, player)
+        else:
+            self._move_pawn(player, move)
+        return token
+
+    def undo(self, token):
+        """Revert the move recorded by an undo token returned from do()."""
+        (player, self.pawn[player], self.h, self.v, self.h_edges, self.v_edges,
+         self.walls_left[player], self.zkey, self._cache_d1, self._cache_d2) = token
+
     def get_all_valid_moves(self, player, current_position_temp=None):
         """
         Get all valid moves for a given player.
@@ -156,166 +344,241 @@ class Board:
             player (int): Player number (1 or 2).
 
         Returns:
-            list: A list of valid moves as tuples (row, col).
+            list: A list of valid moves encoded as by encode_pawn().
         """
-        if player not in self.players:
+        if player not in (1, 2):
             return []
 
-        current_position = self.players[player]
-        row, col = current_position
+        sq = self.pawn[player].bit_length() - 1
         if current_position_temp:
-            row, col = current_position_temp
-
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # Up, Down, Left, Right
-        valid_moves = []
-
-        for dr, dc in directions:
-            new_row, new_col = row + dr, col + dc
-            if self.is_within_bounds(new_row, new_col):
-                # Check for walls in the direction of movement
-                if dr == -1 and (row - 1, col) not in self.walls["horizontal"]:  # Up
-                    valid_moves.append((new_row, new_col))
-                elif dr == 1 and (row, col) not in self.walls["horizontal"]:  # Down
-                    valid_moves.append((new_row, new_col))
-                elif dc == -1 and (row, col - 1) not in self.walls["vertical"]:  # Left
-                    valid_moves.append((new_row, new_col))
-                elif dc == 1 and (row, col) not in self.walls["vertical"]:  # Right
-                    valid_moves.append((new_row, new_col))
-
-        return valid_moves
-    
-    def get_all_valid_wall_placements(self, player):
+            sq = to_square(*current_position_temp)
+
+        walls = (self.h_edges, self.v_edges)
+        return [nsq for nsq, kind, wall_bit in NEIGHBORS[sq] if not walls[kind] & wall_bit]
+
+    def get_all_valid_wall_placements(self, player, relevant_only=False):
+        """
+        Get all legal wall placements for a given player.
+
+        Args:
+            player (int): Player number (1 or 2).
+            relevant_only (bool): Only consider walls near a pawn or an existing
+                wall, falling back to every slot if none of those are legal.
+
+        Returns:
+            list: A list of walls encoded as by encode_wall(). The list is
+            cached per position and must not be modified by the caller.
+        """
         if self.walls_left[player] == 0:
             return []
+        key = (self.zkey, self.walls_left[player], relevant_only)
+        cached = self._wall_cache.get(key)
+        if cached is not None:
+            return cached
+
         valid_wall_placements = []
-        
-        # Check horizontal walls (placed between rows, spanning two columns)
-        for row in range(self.size - 1):
-            for col in range(self.size - 1):
-                # Check if the two cells for the horizontal wall are available
-                if ((row, col) not in self.walls["horizontal"] and
-                    (row, col + 1) not in self.walls["horizontal"] and
-                    # Ensure no overlapping vertical walls
-                    (row, col) not in self.walls["vertical"] and
-                    (row, col + 1) not in self.walls["vertical"]):
-                    
-                    # Temporarily add the horizontal wall
-                    self.walls["horizontal"].add((row, col))
-                    self.walls["horizontal"].add((row, col + 1))
-                    
-                    if self.is_path_valid():
-                        valid_wall_placements.append((row, col, "horizontal"))
-                    
-                    # Remove temporary wall
-                    self.walls["horizontal"].remove((row, col))
-                    self.walls["horizontal"].remove((row, col + 1))
-        
-        # Check vertical walls (placed between columns, spanning two rows)
-        for row in range(self.size - 1):
-            for col in range(self.size - 1):
-                # Check if the two cells for the vertical wall are available
-                if ((row, col) not in self.walls["vertical"] and
-                    (row + 1, col) not in self.walls["vertical"] and
-                    # Ensure no overlapping horizontal walls
-                    (row, col) not in self.walls["horizontal"] and
-                    (row + 1, col) not in self.walls["horizontal"]):
-                    
-                    # Temporarily add the vertical wall
-                    self.walls["vertical"].add((row, col))
-                    self.walls["vertical"].add((row + 1, col))
-                    
-                    if self.is_path_valid():
-                        valid_wall_placements.append((row, col, "vertical"))
-                    
-                    # Remove temporary wall
-                    self.walls["vertical"].remove((row, col))
-                    self.walls["vertical"].remove((row + 1, col))
-        
+        if relevant_only:
+            valid_wall_placements = self._scan_wall_placements(player, self._relevant_squares())
+        if not valid_wall_placements:
+            valid_wall_placements = self._scan_wall_placements(player, ALL_SQUARES)
+
+        if len(self._wall_cache) >= CACHE_MAX_ENTRIES:
+            self._wall_cache.clear()
+        self._wall_cache[key] = valid_wall_placements
         return valid_wall_placements
 
-    def is_path_valid(self):
-        """Check if both players have a valid path to their goals."""
-        from collections import deque
-        
-        def bfs(player, start_row, start_col, goal_row):
-            visited = set()
-            queue = deque([(start_row, start_col)])
-            
-            while queue:
-                row, col = queue.popleft()
-                if (row, col) in visited:
-                    continue
-                visited.add((row, col))
-                
-                if row == goal_row:
-                    return True  # Path exists
-                
-                # Check all possible moves (up, down, left, right)
-                # Up
-                if row > 0 and (row - 1, col) not in self.walls["horizontal"]:
-                    if (row - 1, col) not in visited:
-                        queue.append((row - 1, col))
-                # Down
-                if row < self.size - 1 and (row, col) not in self.walls["horizontal"]:
-                    if (row + 1, col) not in visited:
-                        queue.append((row + 1, col))
-                # Left
-                if col > 0 and (row, col - 1) not in self.walls["vertical"]:
-                    if (row, col - 1) not in visited:
-                        queue.append((row, col - 1))
-                # Right
-                if col < self.size - 1 and (row, col) not in self.walls["vertical"]:
-                    if (row, col + 1) not in visited:
-                        queue.append((row, col + 1))
-            
-            return False  # No path
-        
-        # Check paths for both players
-        p1_start = self.players[1]
-        p2_start = self.players[2]
-        p1_has_path = bfs(1, p1_start[0], p1_start[1], 8)
-        p2_has_path = bfs(2, p2_start[0], p2_start[1], 0)
-        
-        return p1_has_path and p2_has_path
-        
+    def _relevant_squares(self):
+        """Squares near either pawn (distance <= 2) or an existing wall (distance <= 1)."""
+        relevant = NEAR2[self.pawn[1].bit_length() - 1] | NEAR2[self.pawn[2].bit_length() - 1]
+        walls = self.h_edges | self.v_edges
+        while walls:
+            bit = walls & -walls
+            relevant |= NEAR1[bit.bit_length() - 1]
+            walls ^= bit
+        return relevant
+
+    def _scan_wall_placements(self, player, anchors):
+        """
+        Return the legal walls for a player whose anchor square is set in anchors.
+
+        The path distances computed for each candidate are cached under the key
+        the board will have once the player places that wall, so evaluate() can
+        reuse them instead of searching again.
+        """
+        # Fill in the current distances so pawn-move children only recompute the mover's
+        current_paths = self.distances()
+        walls_left = self.walls_left[player]
+        zkey = self.zkey ^ ZWALLS_LEFT[player][walls_left] ^ ZWALLS_LEFT[player][walls_left - 1]
+
+        # Candidates that do not overlap an existing wall: horizontal walls (between
+        # rows, spanning two columns), then vertical walls (spanning two rows)
+        candidates = []
+        for move_bits, conflicts in ((MOVE_WALL, H_CONFLICTS), (MOVE_WALL | WALL_VERTICAL, V_CONFLICTS)):
+            for row in range(self.size - 1):
+                for col in range(self.size - 1):
+                    sq = to_square(row, col)
+                    h_conflicts, v_conflicts = conflicts[sq]
+                    if (anchors >> sq) & 1 and not (self.h & h_conflicts or self.v & v_conflicts):
+                        candidates.append(move_bits | sq)
+
+        # A wall that blocks no edge of either current shortest path leaves both
+        # paths, and so both distances, unchanged. Only walls touching a path
+        # square need a search.
+        path_cells = self.shortest_path_cells(1, 8) | self.shortest_path_cells(2, 0)
+        to_search = [move for move in candidates
+                     if ((V_WALL_MASK if move & WALL_VERTICAL else H_WALL_MASK)
+                         << (move & SQUARE_MASK)) & path_cells]
+        if np is not None and to_search:
+            searched = self._batch_path_distances(to_search)
+        else:
+            searched = [self._wall_path_distances(move) for move in to_search]
+        searched = dict(zip(to_search, searched))
+
+        valid_wall_placements = []
+        for move in candidates:
+            paths = searched.get(move, current_paths)
+            sq = move & SQUARE_MASK
+            self._cache_paths(zkey ^ (ZV[sq] if move & WALL_VERTICAL else ZH[sq]), paths)
+            if paths[1] != NO_PATH:
+                valid_wall_placements.append(move)
+        return valid_wall_placements
+
+    def _wall_path_distances(self, move):
+        """path_distances() with the encoded wall temporarily added."""
+        sq = move & SQUARE_MASK
+        if move & WALL_VERTICAL:
+            mask = V_WALL_MASK << sq
+            self.v_edges |= mask
+            paths = self.path_distances()
+            self.v_edges ^= mask
+        else:
+            mask = H_WALL_MASK << sq
+            self.h_edges |= mask
+            paths = self.path_distances()
+            self.h_edges ^= mask
+        return paths
+
+    def _batch_path_distances(self, walls):
+        """
+        path_distances() for each encoded wall in walls, computed with NumPy.
+
+        Runs one breadth-first flood per (candidate wall, player) pair at once:
+        every step grows all reachable regions by one square across the open
+        edges, and a player's distance is the step at which their region first
+        touches their goal row.
+        """
+        n = len(walls)
+        walls = np.array(walls)
+        squares = walls & SQUARE_MASK
+        vertical = (walls & WALL_VERTICAL).astype(bool)
+        h_edges = np.repeat(_bitboard_to_array(self.h_edges)[None], n, axis=0)
+        v_edges = np.repeat(_bitboard_to_array(self.v_edges)[None], n, axis=0)
+        rows = np.flatnonzero(~vertical)
+        h_edges[rows, squares[rows]] = h_edges[rows, squares[rows] + 1] = True
+        rows = np.flatnonzero(vertical)
+        v_edges[rows, squares[rows]] = v_edges[rows, squares[rows] + SIZE] = True
+
+        # Rows 0..n-1 flood from player 1's pawn, rows n..2n-1 from player 2's
+        open_down = np.tile(~h_edges.reshape(n, SIZE, SIZE)[:, :-1, :], (2, 1, 1))
+        open_right = np.tile(~v_edges.reshape(n, SIZE, SIZE)[:, :, :-1], (2, 1, 1))
+        reach = np.zeros((2 * n, SIZE, SIZE), dtype=bool)
+        reach[:n].reshape(n, -1)[:, self.pawn[1].bit_length() - 1] = True
+        reach[n:].reshape(n, -1)[:, self.pawn[2].bit_length() - 1] = True
+        dist = np.full(2 * n, -1)
+
+        step = 0
+        while True:
+            reached = np.concatenate((reach[:n, SIZE - 1].any(axis=1), reach[n:, 0].any(axis=1)))
+            dist[reached & (dist < 0)] = step
+            if (dist >= 0).all():
+                break
+            grown = reach.copy()
+            grown[:, 1:, :] |= reach[:, :-1, :] & open_down  # Down
+            grown[:, :-1, :] |= reach[:, 1:, :] & open_down  # Up
+            grown[:, :, 1:] |= reach[:, :, :-1] & open_right  # Right
+            grown[:, :, :-1] |= reach[:, :, 1:] & open_right  # Left
+            if (grown == reach).all():
+                break  # Every remaining flood is walled in
+            reach = grown
+            step += 1
+
+        all_paths = []
+        for p1_distance, p2_distance in zip(dist[:n].tolist(), dist[n:].tolist()):
+            if p1_distance < 0:
+                all_paths.append((NO_PATH, NO_PATH))
+            else:
+                all_paths.append((p1_distance, p2_distance if p2_distance >= 0 else NO_PATH))
+        return all_paths
+
+    def shortest_path_cells(self, player, goal_row):
+        """
+        BFS for one shortest path of a player to their goal row.
+
+        Returns:
+            int: Bitmask of the squares on the path, or 0 if the goal is unreachable.
+        """
+        walls = (self.h_edges, self.v_edges)
+        start = self.pawn[player].bit_length() - 1
+        parent = {start: None}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for sq in frontier:
+                if sq // SIZE == goal_row:
+                    # Walk back to the start collecting the path squares
+                    cells = 0
+                    while sq is not None:
+                        cells |= 1 << sq
+                        sq = parent[sq]
+                    return cells
+                for nsq, kind, wall_bit in NEIGHBORS[sq]:
+                    if not walls[kind] & wall_bit and nsq not in parent:
+                        parent[nsq] = sq
+                        next_frontier.append(nsq)
+            frontier = next_frontier
+        return 0
+
+    def path_distances(self):
+        """
+        Compute both players' shortest path lengths to their goal rows.
+
+        Returns:
+            tuple: (p1_distance, p2_distance), or (NO_PATH, NO_PATH) if player 1 is cut off.
+        """
+        p1_distance = self.shortest_path(1, 8)  # Player 1's goal: row 8
+        if p1_distance == NO_PATH:
+            return p1_distance, p1_distance
+        return p1_distance, self.shortest_path(2, 0)  # Player 2's goal: row 0
+
+    def _cache_paths(self, zkey, paths):
+        """Remember path distances for the position with the given Zobrist key."""
+        if len(self._path_cache) >= CACHE_MAX_ENTRIES:
+            self._path_cache.clear()
+        self._path_cache[zkey] = paths
 
     def is_game_over(self):
         """Check if the game has ended."""
-        for player, position in self.players.items():
-            if player == 1 and position[0] == 8:
-                return True
-            if player == 2 and position[0] == 0:
-                return True
-        return False
-
+        return self.get_position(1)[0] == 8 or self.get_position(2)[0] == 0
 
     def display(self):
         """Display the current state of the board."""
-        # Create a copy of the board to display walls and players
-        display_board = [["." for _ in range(self.size)] for _ in range(self.size)]
-
-        # Place players on the board
-        for player, position in self.players.items():
-            display_board[position[0]][position[1]] = str(player)
-
-        # Display the board with walls
         for row in range(self.size):
             row_display = ""
             for col in range(self.size):
-                row_display += display_board[row][col]
-                if (row, col) in self.walls["vertical"]:
-                    row_display += "|"  # Vertical wall
+                bit = 1 << to_square(row, col)
+                if bit == self.pawn[1]:
+                    row_display += "1"
+                elif bit == self.pawn[2]:
+                    row_display += "2"
                 else:
-                    row_display += " "
+                    row_display += "."
+                row_display += "|" if self.v_edges & bit else " "  # Vertical wall
             print(row_display)
             if row < self.size - 1:
                 horizontal_row = ""
                 for col in range(self.size):
-                    if (row, col) in self.walls["horizontal"]:
+                    if self.h_edges & (1 << to_square(row, col)):
                         horizontal_row += "__"
                     else:
                         horizontal_row += "  "
                 print(horizontal_row)
-
-
-